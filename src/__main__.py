@@ -28,28 +28,26 @@ class CloudflareManager:
         if total_lines % self.max_list_size != 0:
             total_lists += 1
 
+        # The policy stores the hash of the domains it was last published with
+        domains_hash = utils.hash_list(domain_list)
+        current_policies = cloudflare.get_current_policies()["result"] or []
+        if utils.get_policy_hash(current_policies, self.policy_name) == domains_hash:
+            silent_error("No changes in domains, skipping")
+            return
+
         current_lists = cloudflare.get_current_lists()["result"] or []
         info(f"Total lists on Cloudflare: {len(current_lists)}")
         
         total_domains = sum([l['count'] for l in current_lists]) if current_lists else 0
         info(f"Total domains on Cloudflare: {total_domains}")
-        
-        current_policies = cloudflare.get_current_policies()["result"] or []
     
-        current_lists_count = 0
         current_lists_count_without_prefix = 0
 
         if current_lists:
             current_lists.sort(key=utils.safe_sort_key)
-            current_lists_count = len(
-                [list_item for list_item in current_lists if self.prefix in list_item["name"]]
-            )
             current_lists_count_without_prefix = len(
                 [list_item for list_item in current_lists if self.prefix not in list_item["name"]]
             )
-            if total_lines == sum([l['count'] for l in current_lists]):
-                silent_error("Same size, skipping")
-                return
 
         if total_lists > self.max_lists - current_lists_count_without_prefix:
             error(
@@ -58,24 +56,16 @@ class CloudflareManager:
             )
             return
 
-        chunked_lists = utils.split_domain_list(domain_list)
-        
-        info(f"Total chunked lists generated: {len(chunked_lists)}")
-
-        used_list_ids = [] 
-        excess_list_ids = []
-        missing_indices = []
+        used_list_ids, excess_list_ids, new_domains = utils.update_lists(
+            current_lists, domain_list, self.adlist_name
+        )
 
-        if current_lists_count > 0:
-            used_list_ids, excess_list_ids, missing_indices = utils.update_lists(current_lists, chunked_lists, self.adlist_name)
-
-        if missing_indices or not used_list_ids:
-            used_list_ids += utils.create_lists(chunked_lists, missing_indices, self.adlist_name)
-        
-        if not used_list_ids:
-            used_list_ids = utils.create_lists(chunked_lists, range(1, total_lists + 1), self.adlist_name)
+        if new_domains:
+            chunked_lists = utils.split_domain_list(new_domains)
+            info(f"Total new lists required: {len(chunked_lists)}")
+            used_list_ids += utils.create_lists(current_lists, chunked_lists, self.adlist_name)
 
-        utils.update_or_create_policy(current_policies, used_list_ids, self.policy_name)
+        utils.update_or_create_policy(current_policies, used_list_ids, self.policy_name, domains_hash)
 
         if excess_list_ids:
             utils.delete_excess_lists(current_lists, excess_list_ids)
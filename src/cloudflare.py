@@ -1,3 +1,5 @@
+import threading
+import requests
 from requests.exceptions import RequestException, HTTPError
 from src import (
     info, session, BASE_URL, MAX_LIST_SIZE, rate_limited_request,
@@ -18,6 +20,16 @@ retry_config = {
     )
 }
 
+thread_local = threading.local()
+
+# requests.Session is not documented as thread-safe, and list items are
+# fetched from a thread pool, so each worker thread gets its own session
+def get_thread_session():
+    if not hasattr(thread_local, "session"):
+        thread_local.session = requests.Session()
+        thread_local.session.headers.update(session.headers)
+    return thread_local.session
+
 @retry(**retry_config)
 def get_current_lists():
     response = session.get(f"{BASE_URL}/lists")
@@ -32,7 +44,7 @@ def get_current_policies():
 
 @retry(**retry_config)
 def get_list_items(list_id):
-    response = session.get(f"{BASE_URL}/lists/{list_id}/items?limit={MAX_LIST_SIZE}")
+    response = get_thread_session().get(f"{BASE_URL}/lists/{list_id}/items?limit={MAX_LIST_SIZE}")
     response.raise_for_status()
     return response.json()
 
@@ -1,54 +1,157 @@
+import os
+import idna
+import multiprocessing
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from src import (
     info,
-    ip_pattern, 
-    domain_pattern, 
-    replace_pattern
+    domain_pattern
 )
 
-def convert_to_domain_list(block_content: str, white_content: str) -> list[str]:
+HOST_CHARS = "0123456789abcdefABCDEF:."
+PARALLEL_MIN_LINES = 500_000
+# Comment markers in hosts files and adblock filter lists
+SKIP_CHARS = frozenset("#!/")
+
+def convert_to_domain_list(
+    block_contents: Iterable[str], white_contents: Iterable[str]
+) -> list[str]:
     white_domains = set()
     block_domains = set()
 
-    extract_domains(white_content, white_domains)
+    extract_domains(white_contents, white_domains)
     info(f"Number of whitelisted domains: {len(white_domains)}")
 
-    extract_domains(block_content, block_domains)
-    block_domains = remove_subdomains_if_higher(block_domains)
+    extract_domains(block_contents, block_domains)
     info(f"Number of blocked domains: {len(block_domains)}")
 
-    final_domains = sorted(list(block_domains - white_domains))
+    final_domains = filter_domains(block_domains, white_domains)
     info(f"Number of final domains: {len(final_domains)}")
 
     return final_domains
 
-def extract_domains(content: str, domains: set[str]) -> None:
-    for line in content.splitlines():
-        if line.startswith(("#", "!", "/")) or line == "":
+def extract_domains(contents: Iterable[str], domains: set[str]) -> None:
+    # Files are normalized one at a time so only one file's lines are held in
+    # memory. Repeated lines, and lines that are already a known domain from
+    # an earlier file, are dropped before the Python loop
+    workers = available_cpus()
+    for content in contents:
+        lines = set(content.lower().splitlines())
+        lines.difference_update(domains)
+        if workers > 1 and len(lines) >= PARALLEL_MIN_LINES:
+            extract_lines_parallel(list(lines), domains, workers)
+        else:
+            extract_lines(lines, domains)
+
+def available_cpus() -> int:
+    # Respects CPU affinity where the platform exposes it
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def extract_lines_parallel(lines: list[str], domains: set[str], workers: int) -> None:
+    # Normalization is CPU-bound and independent per line, so large files are
+    # split into one shard per core. Below PARALLEL_MIN_LINES the cost of
+    # starting workers and shipping lines to them outweighs the gain.
+    # Downloads are still running on other threads, so workers are spawned
+    # rather than forked from a multi-threaded process
+    size = -(-len(lines) // workers)
+    shards = [lines[i : i + size] for i in range(0, len(lines), size)]
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            for shard_domains in executor.map(normalize_lines, shards):
+                domains.update(shard_domains)
+    except (NotImplementedError, ImportError, OSError, BrokenProcessPool):
+        # No working process pool on this platform (e.g. missing sem_open)
+        extract_lines(lines, domains)
+
+def normalize_lines(lines: list[str]) -> set[str]:
+    domains = set()
+    extract_lines(lines, domains)
+    return domains
+
+def extract_lines(lines: Iterable[str], domains: set[str]) -> None:
+    # Bind hot lookups to locals, this loop runs once per distinct line
+    add = domains.add
+    strip = strip_prefix
+    is_valid = is_valid_domain
+    is_ip = is_ip_address
+    idna_encode = idna.encode
+    IDNAError = idna.IDNAError
+
+    for line in lines:
+        if not line or line[0] in SKIP_CHARS:
             continue
 
-        cleaned_line = line.lower().strip().split("#")[0].split("^")[0].replace("\r", "")
-        domain = replace_pattern.sub("", cleaned_line, count=1)
-        try:
-            domain = domain.encode("idna").decode("utf-8", "replace")
-            if domain_pattern.match(domain) and not ip_pattern.match(domain):
-                domains.add(domain)
-        except Exception:
-            pass
+        end = line.find("#")
+        if end == -1:
+            end = len(line)
+        caret = line.find("^", 0, end)
+        if caret != -1:
+            end = caret
+        cleaned_line = line[:end].strip()
+        domain = strip(cleaned_line)
+        if not domain.isascii():
+            # Transitional mapping keeps ß -> ss and ς -> σ as the stdlib codec
+            # did; names IDNA 2008 rejects (e.g. emoji) still get the codec
+            try:
+                domain = idna_encode(domain, uts46=True, transitional=True).decode("ascii")
+            except IDNAError:
+                try:
+                    domain = domain.encode("idna").decode("ascii")
+                except UnicodeError:
+                    continue
+        if is_valid(domain) and not is_ip(domain):
+            add(domain)
             
-def remove_subdomains_if_higher(domains: set[str]) -> set[str]:
-    top_level_domains = set()
-    
+def strip_prefix(line: str) -> str:
+    # Every prefix is identified by its first character, so one comparison
+    # picks the branch instead of a regex or a chain of startswith calls
+    first = line[:1]
+    if first == "|":
+        return line[2:] if line.startswith("||") else line
+    if first == "@":
+        return line[4:] if line.startswith("@@||") else line
+    if first == "*":
+        return line[2:] if line.startswith("*.") else line[1:]
+
+    # Hosts file entry: "<ip> <domain>"
+    if first and first in HOST_CHARS:
+        rest = line.lstrip(HOST_CHARS)
+        if rest[:1].isspace():
+            return rest.lstrip()
+    return line
+
+def is_valid_domain(domain: str) -> bool:
+    return len(domain) <= 253 and domain_pattern.match(domain) is not None
+
+def is_ip_address(domain: str) -> bool:
+    return domain.count(".") == 3 and all(
+        len(part) <= 3 and part.isdigit() for part in domain.split(".")
+    )
+
+def filter_domains(domains: set[str], white_domains: set[str]) -> list[str]:
+    final_domains = []
+    add = final_domains.append
+
+    # Drops whitelisted domains and subdomains of other blocked domains in a
+    # single pass. Runs over the complete set, so the result doesn't depend
+    # on the order domains appeared in the lists. A whitelisted parent still
+    # covers its subdomains, as it did when the whitelist was applied last
     for domain in domains:
-        parts = domain.split(".")
-            
-        is_lower_subdomain = False            
-        for i in range(1, len(parts)):
-            higher_domain = ".".join(parts[i:])
-            if higher_domain in domains:
-                is_lower_subdomain = True
+        if domain in white_domains:
+            continue
+        idx = domain.find(".")
+        while idx != -1:
+            if domain[idx + 1:] in domains:
                 break
-                    
-        if not is_lower_subdomain:
-            top_level_domains.add(domain)
-                
-    return top_level_domains
+            idx = domain.find(".", idx + 1)
+        else:
+            add(domain)
+
+    final_domains.sort()
+    return final_domains
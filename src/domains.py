@@ -1,8 +1,12 @@
 import os
 import requests
 from configparser import ConfigParser
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from src import info, convert
 
+MAX_DOWNLOAD_WORKERS = 8
+
 class DomainConverter:
     def __init__(self):
         self.env_file_map = {
@@ -45,31 +49,30 @@ class DomainConverter:
     def download_file(self, url):
         r = requests.get(url, allow_redirects=True)
         info(f"Downloaded file from {url} File size: {len(r.content)}")
-        return r.text
+        # Lists are UTF-8, but r.text falls back to ISO-8859-1 for text/*
+        # responses without a charset, which garbles IDN entries
+        return r.content.decode("utf-8", "replace")
         
+    def read_dynamic_list(self, env_var):
+        # Dynamic lists from environment variables take precedence over files
+        content = os.getenv(env_var, "")
+        if content:
+            return content
+        with open(self.env_file_map[env_var], "r") as file:
+            return file.read()
+
     def process_urls(self):
-        block_content = ""
-        white_content = ""
-        for url in self.adlist_urls:
-            block_content += self.download_file(url)
-        for url in self.whitelist_urls:
-            white_content += self.download_file(url)
-        
-        # Check for dynamic blacklist and whitelist in environment variables
-        dynamic_blacklist = os.getenv("DYNAMIC_BLACKLIST", "")
-        dynamic_whitelist = os.getenv("DYNAMIC_WHITELIST", "")
-        
-        if dynamic_blacklist:
-            block_content += dynamic_blacklist
-        else:
-            with open(self.env_file_map["DYNAMIC_BLACKLIST"], "r") as black_file:
-                block_content += black_file.read()
-        
-        if dynamic_whitelist:
-            white_content += dynamic_whitelist
-        else:
-            with open(self.env_file_map["DYNAMIC_WHITELIST"], "r") as white_file:
-                white_content += white_file.read()
-        
-        domains = convert.convert_to_domain_list(block_content, white_content)
+        # Files are handed to the converter one at a time as they arrive, so
+        # the lists are never concatenated into one large string
+        with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as executor:
+            # Whitelists are converted first, so queue their downloads first
+            white_contents = chain(
+                executor.map(self.download_file, self.whitelist_urls),
+                [self.read_dynamic_list("DYNAMIC_WHITELIST")]
+            )
+            block_contents = chain(
+                executor.map(self.download_file, self.adlist_urls),
+                [self.read_dynamic_list("DYNAMIC_BLACKLIST")]
+            )
+            domains = convert.convert_to_domain_list(block_contents, white_contents)
         return domains
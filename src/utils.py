@@ -1,12 +1,15 @@
 import re
 import time
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from src import (
     cloudflare,
     info, silent_error,
     MAX_LIST_SIZE
 )
 
+MAX_FETCH_WORKERS = 8
+
 def split_domain_list(domain_list):
     return [
         domain_list[i : i + MAX_LIST_SIZE]
@@ -21,10 +24,10 @@ def create_list_payload(name, chunk_list):
         "items": [{"value": domain} for domain in chunk_list],
     }
 
-def create_policy_json(name, used_list_ids):
+def create_policy_json(name, used_list_ids, domains_hash):
     return {
         "name": name,
-        "description": "Block Ads & Tracking",
+        "description": f"Block Ads & Tracking - sha256:{domains_hash}",
         "action": "block",
         "enabled": True,
         "traffic": "or".join([
@@ -48,74 +51,96 @@ def safe_sort_key(list_item):
     return int(match.group()) if match else float('inf')
 
 def hash_list(list_items):
-    hash_object = hashlib.sha256()
-    for item in sorted(list_items):
-        hash_object.update(item.encode('utf-8'))
-    return hash_object.hexdigest()
+    # Join with a separator so ["a.co", "b.com"] and ["a.cob.com"] differ
+    return hashlib.sha256("\n".join(sorted(list_items)).encode('utf-8')).hexdigest()
+
+def get_policy_hash(current_policies, policy_name):
+    for policy_item in current_policies:
+        if policy_item["name"] == policy_name:
+            match = re.search(r'sha256:([0-9a-f]{64})', policy_item.get("description") or "")
+            return match.group(1) if match else None
+    return None
+
+def get_list_values(list_id):
+    list_items = cloudflare.get_list_items(list_id)
+    return {
+        item["value"] for item in list_items.get("result", []) if item["value"] is not None
+    }
 
-def update_lists(current_lists, chunked_lists, adlist_name):
+def update_lists(current_lists, domain_list, adlist_name):
     used_list_ids = []
     excess_list_ids = []
 
+    managed_lists = [
+        list_item for list_item in current_lists if f"{adlist_name}" in list_item["name"]
+    ]
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        current_values = list(executor.map(
+            get_list_values, [list_item["id"] for list_item in managed_lists]
+        ))
+
+    # Domains stay in the list that already holds them, so a change only
+    # touches the lists it affects. New domains fill the free space first
+    domain_set = set(domain_list)
+    published = set().union(*current_values)
+    new_domains = [domain for domain in domain_list if domain not in published]
+    position = 0
+
+    for list_item, values in zip(managed_lists, current_values):
+        removed = values - domain_set
+        free_space = MAX_LIST_SIZE - (len(values) - len(removed))
+        appended = new_domains[position : position + free_space]
+        position += len(appended)
+
+        if len(values) == len(removed) and not appended:
+            info(f"Marking list {list_item['name']} for deletion")
+            excess_list_ids.append(list_item["id"])
+            continue
+
+        used_list_ids.append(list_item["id"])
+        if not removed and not appended:
+            info(f"No changes detected for list {list_item['name']}, skipping update")
+            continue
+
+        info(
+            f"Updating list {list_item['name']} "
+            f"(+{len(appended)} / -{len(removed)})"
+        )
+        payload = {
+            "append": [{"value": domain} for domain in appended],
+            "remove": sorted(removed),
+        }
+        cloudflare.patch_list(list_item["id"], payload)
+
+    return used_list_ids, excess_list_ids, new_domains[position:]
+
+def create_lists(current_lists, chunked_lists, adlist_name):
+    used_list_ids = []
+
     existing_indices = [
         int(re.search(r'\d+', list_item["name"]).group())
         for list_item in current_lists
         if f"{adlist_name}" in list_item["name"]
     ]
+    missing_indices = get_missing_indices(
+        existing_indices, len(existing_indices) + len(chunked_lists)
+    )
 
-    total_lists = len(chunked_lists)
-    missing_indices = get_missing_indices(existing_indices, total_lists)
-
-    for list_item in current_lists:
-        if f"{adlist_name}" in list_item["name"]:
-            list_index = int(re.search(r'\d+', list_item["name"]).group())
-            if list_index in existing_indices and list_index - 1 < len(chunked_lists):
-                list_items = cloudflare.get_list_items(list_item["id"])
-                list_items_values = [
-                    item["value"] for item in list_items.get("result", []) if item["value"] is not None
-                ]
-                new_list_items = chunked_lists[list_index - 1]
-
-                if hash_list(new_list_items) == hash_list(list_items_values):
-                    info(f"No changes detected for list {list_item['name']}, skipping update")
-                    used_list_ids.append(list_item["id"])
-                else:
-                    info(f"Updating list {list_item['name']}")
-                    list_items_array = [{"value": domain} for domain in new_list_items]
-
-                    payload = {
-                        "append": list_items_array,
-                        "remove": list_items_values,
-                    }
-
-                    cloudflare.patch_list(list_item["id"], payload)
-                    used_list_ids.append(list_item["id"])
-                continue
-
-            info(f"Marking list {list_item['name']} for deletion")
-            excess_list_ids.append(list_item["id"])
-
-    return used_list_ids, excess_list_ids, missing_indices
-
-def create_lists(chunked_lists, missing_indices, adlist_name):
-    used_list_ids = []
-
-    for index in missing_indices:
-        if index - 1 < len(chunked_lists):
-            formatted_counter = f"{index:03d}"
-            info(f"Creating list {adlist_name} - {formatted_counter}")
+    for index, chunk in zip(missing_indices, chunked_lists):
+        formatted_counter = f"{index:03d}"
+        info(f"Creating list {adlist_name} - {formatted_counter}")
 
-            payload = create_list_payload(
-                f"{adlist_name} - {formatted_counter}", chunked_lists[index - 1]
-            )
+        payload = create_list_payload(
+            f"{adlist_name} - {formatted_counter}", chunk
+        )
 
-            created_list = cloudflare.create_list(payload)
-            if created_list:
-                used_list_ids.append(created_list.get("result", {}).get("id"))
+        created_list = cloudflare.create_list(payload)
+        if created_list:
+            used_list_ids.append(created_list.get("result", {}).get("id"))
 
     return used_list_ids
 
-def update_or_create_policy(current_policies, used_list_ids, policy_name):
+def update_or_create_policy(current_policies, used_list_ids, policy_name, domains_hash):
     policy_id = None
 
     for policy_item in current_policies:
@@ -123,7 +148,7 @@ def update_or_create_policy(current_policies, used_list_ids, policy_name):
             policy_id = policy_item["id"]
 
     json_data = create_policy_json(
-        policy_name, used_list_ids
+        policy_name, used_list_ids, domains_hash
     )
 
     if not policy_id or policy_id == "null":